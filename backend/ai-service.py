@@ -1,4 +1,14 @@
 import os
+
+# Cap library thread pools before they are created. Small 128x128 inputs gain
+# nothing from wide pools, and gunicorn threads would oversubscribe the cores.
+# Set TF_NUM_INTRAOP_THREADS to tune this against the gunicorn worker count.
+INFERENCE_THREADS = int(os.environ.get('TF_NUM_INTRAOP_THREADS', 2))
+INTEROP_THREADS = int(os.environ.get('TF_NUM_INTEROP_THREADS', 1))
+os.environ['TF_NUM_INTRAOP_THREADS'] = str(INFERENCE_THREADS)
+os.environ['TF_NUM_INTEROP_THREADS'] = str(INTEROP_THREADS)
+os.environ.setdefault('OMP_NUM_THREADS', str(INFERENCE_THREADS))
+
 import cv2
 import numpy as np
 from flask import Flask, request, jsonify
@@ -8,6 +18,14 @@ from PIL import Image
 import base64
 import io
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+tf.config.threading.set_inter_op_parallelism_threads(INTEROP_THREADS)
+tf.config.threading.set_intra_op_parallelism_threads(INFERENCE_THREADS)
+cv2.setNumThreads(1)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,93 +34,168 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'webp'})
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Micro-batching: requests queue their images and a single background
+# thread coalesces them into one interpreter invocation
+MAX_BATCH_SIZE = 8
+BATCH_WINDOW_SECONDS = 0.005
+# Kept below the backend's 10 s AI service timeout so the error reaches the client
+PREDICTION_TIMEOUT_SECONDS = 5
+request_queue = queue.Queue()
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# One interpreter is allocated per supported batch size at startup, and each
+# batch is padded up to the nearest size, so tensors are never reallocated
+# while serving requests
+BATCH_SIZES = (1, 4, MAX_BATCH_SIZE)
+
+# Load the quantized TFLite model once and reuse it for every request.
+# Interpreters are not thread-safe, so only the batching thread touches them.
+interpreters = {}
+input_details = None
+output_details = None
+
+# Input tensor reused for every batch, owned by the batching thread
+input_buffer = np.empty((MAX_BATCH_SIZE, 128, 128, 3), dtype=np.int8)
+input_lut = None
 
-# Load the trained model
-model = None
 try:
     # Try different possible paths for the model
     model_paths = [
-        'models/face_mask_detection_model.h5',
-        '../models/face_mask_detection_model.h5',
-        '../../models/face_mask_detection_model.h5'
+        'models/face_mask_detection_model.tflite',
+        '../models/face_mask_detection_model.tflite',
+        '../../models/face_mask_detection_model.tflite'
     ]
     
     for model_path in model_paths:
         if os.path.exists(model_path):
-            model = tf.keras.models.load_model(model_path)
+            for batch_size in BATCH_SIZES:
+                interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=INFERENCE_THREADS)
+                input_details = interpreter.get_input_details()
+                output_details = interpreter.get_output_details()
+                interpreter.resize_tensor_input(input_details[0]['index'], [batch_size, 128, 128, 3])
+                interpreter.allocate_tensors()
+                interpreters[batch_size] = interpreter
+            
+            # Map every uint8 pixel value straight to its quantized int8 input
+            input_scale, input_zero_point = input_details[0]['quantization']
+            pixel_values = np.arange(256, dtype=np.float32) / 255.0
+            input_lut = np.clip(np.round(pixel_values / input_scale + input_zero_point), -128, 127).astype(np.int8)
             logger.info(f"Model loaded successfully from {model_path}!")
             break
     
-    if model is None:
+    if not interpreters:
         logger.error("Model not found in any expected location!")
-        logger.error("Please ensure the model exists at models/face_mask_detection_model.h5")
+        logger.error("Please ensure the model exists at models/face_mask_detection_model.tflite")
         
 except Exception as e:
+    interpreters = {}
     logger.error(f"Error loading model: {e}")
-    logger.error("Please train the model first using train_model.py")
+    logger.error("Please train the model using train_model.py and convert it with convert_to_tflite.py")
+
+def collect_batch():
+    """Wait for a request, then gather more until the batch window closes"""
+    items = [request_queue.get()]
+    deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+    
+    while len(items) < MAX_BATCH_SIZE:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            items.append(request_queue.get(timeout=timeout))
+        except queue.Empty:
+            break
+    
+    # Skip requests that timed out and cancelled while queued
+    return [(image, future) for image, future in items if future.set_running_or_notify_cancel()]
+
+def run_batches():
+    """Run queued images through the interpreters in batches"""
+    while True:
+        items = collect_batch()
+        if not items:
+            continue
+        
+        try:
+            # Pad up to the smallest preallocated batch size; padded rows are ignored
+            batch_size = min(size for size in BATCH_SIZES if size >= len(items))
+            interpreter = interpreters[batch_size]
+            
+            # Normalize and quantize uint8 pixels in a single pass
+            for i, (image, _) in enumerate(items):
+                np.take(input_lut, image, out=input_buffer[i])
+            
+            interpreter.set_tensor(input_details[0]['index'], input_buffer[:batch_size])
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_details[0]['index'])
+            
+            # Dequantize output probabilities
+            output_scale, output_zero_point = output_details[0]['quantization']
+            predictions = (output.astype(np.float32) - output_zero_point) * output_scale
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            continue
+        
+        for i, (_, future) in enumerate(items):
+            future.set_result(predictions[i:i + 1])
+
+if interpreters:
+    threading.Thread(target=run_batches, name='inference-batcher', daemon=True).start()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, dot, extension = filename.rpartition('.')
+    return bool(dot) and extension.lower() in ALLOWED_EXTENSIONS
 
-def preprocess_image(image_path):
-    """Preprocess image for model prediction"""
+def preprocess_image(image_bytes):
+    """Preprocess encoded image bytes for model prediction"""
     try:
-        # Read image
-        image = cv2.imread(image_path)
+        # Decode image directly from memory
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
         if image is None:
-            return None, None
+            return None
         
         # Resize to 128x128
-        image_resized = cv2.resize(image, (128, 128))
-        
-        # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image_resized, cv2.COLOR_BGR2RGB)
+        image_resized = cv2.resize(image, (128, 128), interpolation=cv2.INTER_AREA)
         
-        # Normalize
-        image_normalized = image_rgb / 255.0
+        # Convert BGR to RGB in place
+        cv2.cvtColor(image_resized, cv2.COLOR_BGR2RGB, dst=image_resized)
         
-        # Reshape for model input
-        image_reshaped = np.expand_dims(image_normalized, axis=0)
-        
-        return image_reshaped, image
+        # Normalization is folded into the quantization lookup in run_batches
+        return image_resized
     except Exception as e:
         logger.error(f"Error preprocessing image: {e}")
-        return None, None
+        return None
 
-def predict_mask(image_path):
+def predict_mask(image_bytes):
     """Predict if person is wearing mask or not"""
-    if model is None:
-        return None, "Model not loaded. Please train the model first."
+    if not interpreters:
+        return None, "Model not loaded. Please train and convert the model first."
     
     try:
         # Preprocess image
-        processed_image, original_image = preprocess_image(image_path)
+        processed_image = preprocess_image(image_bytes)
         
         if processed_image is None:
             return None, "Error processing image"
         
-        # Make prediction
-        prediction = model.predict(processed_image, verbose=0)
+        # Make prediction as part of the next batch
+        future = Future()
+        request_queue.put((processed_image, future))
+        try:
+            prediction = future.result(timeout=PREDICTION_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()
+            return None, "Prediction timed out"
         
         # Get prediction probabilities
-        mask_prob = prediction[0][1]  # Probability of wearing mask
-        no_mask_prob = prediction[0][0]  # Probability of not wearing mask
-        
-        # Get prediction label
-        pred_label = np.argmax(prediction[0])
+        mask_prob = float(prediction[0, 1])  # Probability of wearing mask
+        no_mask_prob = float(prediction[0, 0])  # Probability of not wearing mask
         
         # Determine result
-        if pred_label == 1:
+        if mask_prob > no_mask_prob:
             result = "Wearing Mask"
             confidence = mask_prob
         else:
@@ -111,9 +204,9 @@ def predict_mask(image_path):
         
         return {
             'result': result,
-            'confidence': float(confidence),
-            'mask_probability': float(mask_prob),
-            'no_mask_probability': float(no_mask_prob)
+            'confidence': confidence,
+            'mask_probability': mask_prob,
+            'no_mask_probability': no_mask_prob
         }, None
         
     except Exception as e:
@@ -125,7 +218,7 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None,
+        'model_loaded': bool(interpreters),
         'service': 'ai-prediction-service'
     })
 
@@ -141,28 +234,18 @@ def upload_file():
             return jsonify({'error': 'No file selected'}), 400
         
         if file and allowed_file(file.filename):
-            # Secure filename and save
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            image_bytes = file.read()
             
             # Make prediction
-            prediction, error = predict_mask(filepath)
+            prediction, error = predict_mask(image_bytes)
             
             if error:
                 return jsonify({'error': error}), 500
             
-            # Convert image to base64 for display
-            with open(filepath, 'rb') as img_file:
-                img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            # Clean up uploaded file
-            os.remove(filepath)
-            
             return jsonify({
                 'success': True,
                 'prediction': prediction,
-                'image': img_data,
                 'filename': filename
             })
         
@@ -186,16 +269,31 @@ def webcam_prediction():
         image_data = data['image'].split(',')[1]  # Remove data:image/jpeg;base64, prefix
         image_bytes = base64.b64decode(image_data)
         
-        # Save temporary image
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], 'temp_webcam.jpg')
-        with open(temp_path, 'wb') as f:
-            f.write(image_bytes)
-        
         # Make prediction
-        prediction, error = predict_mask(temp_path)
+        prediction, error = predict_mask(image_bytes)
+        
+        if error:
+            return jsonify({'error': error}), 500
+        
+        return jsonify({
+            'success': True,
+            'prediction': prediction
+        })
+        
+    except Exception as e:
+        logger.error(f"Webcam prediction error: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/webcam_raw', methods=['POST'])
+def webcam_raw_prediction():
+    """Handle webcam prediction for raw image bytes sent as the request body"""
+    try:
+        image_bytes = request.get_data(cache=False)
+        if not image_bytes:
+            return jsonify({'error': 'No image data received'}), 400
         
-        # Clean up
-        os.remove(temp_path)
+        # Make prediction
+        prediction, error = predict_mask(image_bytes)
         
         if error:
             return jsonify({'error': error}), 500
@@ -211,5 +309,5 @@ def webcam_prediction():
 
 if __name__ == '__main__':
     logger.info("Starting AI Prediction Service...")
-    logger.info("Make sure you have trained the model first using train_model.py")
+    logger.info("Make sure you have trained and converted the model first using train_model.py and convert_to_tflite.py")
     app.run(debug=False, host='0.0.0.0', port=5000)
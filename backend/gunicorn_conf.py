@@ -0,0 +1,18 @@
+# Gunicorn configuration for the AI prediction service
+# Run from the backend directory: gunicorn -c gunicorn_conf.py 'ai-service:app'
+
+bind = '0.0.0.0:5000'
+
+# A single worker keeps one inference batcher, so concurrent requests are
+# coalesced into shared batches instead of being split across processes.
+# The threads only decode images and wait on the batcher, and TFLite
+# releases the GIL while the interpreter runs.
+workers = 1
+worker_class = 'gthread'
+threads = 8
+
+# The model is loaded in the worker rather than preloaded in the master:
+# the batching thread and the interpreter's thread pool do not survive fork.
+preload_app = False
+
+timeout = 60
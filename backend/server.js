@@ -562,9 +562,12 @@ app.post('/api/attendance/check-in', authenticateToken, async (req, res) => {
     // If image data provided, use face mask detection
     if (imageData) {
       try {
-        const aiResponse = await axios.post(`${AI_SERVICE_URL}/webcam`, {
-          image: imageData
-        }, {
+        // Send raw JPEG bytes instead of a JSON-wrapped base64 string
+        const base64Data = imageData.replace(/^data:image\/[a-z]+;base64,/, '');
+        const aiResponse = await axios.post(`${AI_SERVICE_URL}/webcam_raw`, Buffer.from(base64Data, 'base64'), {
+          headers: {
+            'Content-Type': 'image/jpeg'
+          },
           timeout: 10000
         });
         
@@ -1128,7 +1131,6 @@ app.post('/api/predict', authenticateToken, upload.single('image'), async (req,
     res.json({
       success: true,
       prediction: aiResponse.data.prediction,
-      image: aiResponse.data.image,
       filename: req.file.originalname,
       stats: stats,
       detectionId: detection.id
@@ -0,0 +1,155 @@
+import os
+import glob
+import hashlib
+import json
+import math
+from sklearn.model_selection import train_test_split
+import tensorflow as tf
+
+TFRECORD_DIR = 'data/tfrecords'
+IMAGES_PER_SHARD = 1000
+COMPLETE_MARKER = os.path.join(TFRECORD_DIR, '_COMPLETE.json')
+DATASET_DIRS = ['data/with_mask/', 'data/without_mask/']
+
+def load_image_paths():
+    """Collect image paths and labels for the face mask dataset"""
+    print("Loading dataset file list...")
+
+    # Check if data directory exists
+    if not os.path.exists('data'):
+        print("Data directory not found. Please download the dataset first.")
+        return None, None
+
+    with_mask_path, without_mask_path = DATASET_DIRS
+
+    if not os.path.exists(with_mask_path) or not os.path.exists(without_mask_path):
+        print("Dataset not found in expected location.")
+        return None, None
+
+    with_mask_files = os.listdir(with_mask_path)
+    without_mask_files = os.listdir(without_mask_path)
+
+    print(f'Number of with mask images: {len(with_mask_files)}')
+    print(f'Number of without mask images: {len(without_mask_files)}')
+
+    image_paths = [os.path.join(with_mask_path, f) for f in with_mask_files] + \
+                  [os.path.join(without_mask_path, f) for f in without_mask_files]
+
+    # Create labels
+    labels = [1] * len(with_mask_files) + [0] * len(without_mask_files)
+
+    return image_paths, labels
+
+def shard_pattern(split):
+    """Glob pattern matching every shard of a split"""
+    return os.path.join(TFRECORD_DIR, f'{split}-*.tfrecord')
+
+def dataset_fingerprint():
+    """Summarize the dataset folders by per-class counts and a digest of paths and mtimes"""
+    if not all(os.path.exists(folder) for folder in DATASET_DIRS):
+        return None
+
+    counts = {}
+    digest = hashlib.sha256()
+    for folder in DATASET_DIRS:
+        names = sorted(os.listdir(folder))
+        counts[folder] = len(names)
+        for name in names:
+            path = os.path.join(folder, name)
+            digest.update(f'{path}\0{os.stat(path).st_mtime_ns}\n'.encode('utf-8'))
+
+    return {'counts': counts, 'digest': digest.hexdigest()}
+
+def tfrecords_up_to_date():
+    """Check that a completed build exists and covers the current dataset"""
+    if not os.path.exists(COMPLETE_MARKER):
+        return False
+
+    with open(COMPLETE_MARKER) as f:
+        marker = json.load(f)
+
+    if marker.get('fingerprint') != dataset_fingerprint():
+        print("Dataset changed since the TFRecords were built.")
+        return False
+
+    return True
+
+def create_example(image_path, label):
+    """Wrap the raw JPEG bytes and label of one image in a tf.train.Example"""
+    with open(image_path, 'rb') as f:
+        encoded = f.read()
+
+    return tf.train.Example(features=tf.train.Features(feature={
+        'image/encoded': tf.train.Feature(bytes_list=tf.train.BytesList(value=[encoded])),
+        'image/label': tf.train.Feature(int64_list=tf.train.Int64List(value=[label]))
+    }))
+
+def write_split(split, image_paths, labels):
+    """Write one split as a set of TFRecord shards"""
+    num_shards = max(1, math.ceil(len(image_paths) / IMAGES_PER_SHARD))
+
+    # Remove shards and partial writes left over from a previous build
+    stale_paths = glob.glob(shard_pattern(split)) + glob.glob(shard_pattern(split) + '.tmp')
+    for stale_path in stale_paths:
+        os.remove(stale_path)
+
+    for shard in range(num_shards):
+        shard_path = os.path.join(TFRECORD_DIR, f'{split}-{shard:05d}-of-{num_shards:05d}.tfrecord')
+        start = shard * IMAGES_PER_SHARD
+        end = start + IMAGES_PER_SHARD
+
+        # Write to a temporary name so an interrupted build never leaves a
+        # truncated shard that matches the split's glob
+        temp_path = shard_path + '.tmp'
+        with tf.io.TFRecordWriter(temp_path) as writer:
+            for image_path, label in zip(image_paths[start:end], labels[start:end]):
+                writer.write(create_example(image_path, label).SerializeToString())
+        os.replace(temp_path, shard_path)
+
+    print(f"{split}: {len(image_paths)} images in {num_shards} shards")
+
+def build_tfrecords():
+    """Split the dataset and serialize each split to TFRecord shards"""
+    print("Building TFRecord shards...")
+
+    image_paths, labels = load_image_paths()
+    if image_paths is None or labels is None:
+        return False
+
+    # Fingerprint before reading so edits made during the build trigger a rebuild
+    fingerprint = dataset_fingerprint()
+
+    # Split data
+    train_paths, test_paths, train_labels, test_labels = train_test_split(
+        image_paths, labels, test_size=0.2, random_state=2
+    )
+    train_paths, val_paths, train_labels, val_labels = train_test_split(
+        train_paths, train_labels, test_size=0.1, random_state=2
+    )
+
+    # Create tfrecords directory if it doesn't exist
+    if not os.path.exists(TFRECORD_DIR):
+        os.makedirs(TFRECORD_DIR)
+
+    # Invalidate any previous build until every split is written
+    if os.path.exists(COMPLETE_MARKER):
+        os.remove(COMPLETE_MARKER)
+
+    write_split('train', train_paths, train_labels)
+    write_split('val', val_paths, val_labels)
+    write_split('test', test_paths, test_labels)
+
+    with open(COMPLETE_MARKER, 'w') as f:
+        json.dump({
+            'fingerprint': fingerprint,
+            'image_count': len(image_paths),
+            'train': len(train_paths),
+            'val': len(val_paths),
+            'test': len(test_paths)
+        }, f)
+
+    print(f"TFRecords saved to {TFRECORD_DIR}")
+    return True
+
+if __name__ == "__main__":
+    build_tfrecords()
@@ -0,0 +1,85 @@
+import os
+import random
+import cv2
+import numpy as np
+import tensorflow as tf
+
+SAVED_MODEL_PATH = 'models/face_mask_detection_model'
+KERAS_MODEL_PATH = 'models/face_mask_detection_model.h5'
+TFLITE_MODEL_PATH = 'models/face_mask_detection_model.tflite'
+CALIBRATION_SAMPLES = 200
+
+def calibration_files():
+    """Collect a balanced sample of dataset images for calibration"""
+    files = []
+    per_class = CALIBRATION_SAMPLES // 2
+
+    for folder in ['data/with_mask/', 'data/without_mask/']:
+        if not os.path.exists(folder):
+            print(f"Calibration folder not found: {folder}")
+            continue
+
+        names = sorted(os.listdir(folder))
+        random.Random(2).shuffle(names)
+        files.extend(os.path.join(folder, name) for name in names[:per_class])
+
+    return files
+
+def representative_dataset():
+    """Yield preprocessed images matching the inference preprocessing"""
+    for path in calibration_files():
+        image = cv2.imread(path)
+        if image is None:
+            continue
+
+        image = cv2.resize(image, (128, 128), interpolation=cv2.INTER_AREA)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = image.astype(np.float32) / 255.0
+
+        yield [np.expand_dims(image, axis=0)]
+
+def create_converter():
+    """Create a converter from the SavedModel, falling back to the legacy .h5 model"""
+    if os.path.isdir(SAVED_MODEL_PATH):
+        print(f"Loading SavedModel from {SAVED_MODEL_PATH}")
+        return tf.lite.TFLiteConverter.from_saved_model(SAVED_MODEL_PATH)
+
+    if os.path.exists(KERAS_MODEL_PATH):
+        print("=" * 70)
+        print(f"WARNING: No SavedModel found at {SAVED_MODEL_PATH}.")
+        print(f"Falling back to the LEGACY model at {KERAS_MODEL_PATH}.")
+        print("This model predates the current architecture in train_model.py.")
+        print("Run train_model.py to export an up-to-date model before converting.")
+        print("=" * 70)
+        print(f"Loading Keras model from {KERAS_MODEL_PATH}")
+        model = tf.keras.models.load_model(KERAS_MODEL_PATH)
+        return tf.lite.TFLiteConverter.from_keras_model(model)
+
+    return None
+
+def convert_model():
+    """Convert the trained model to a full-integer TFLite model"""
+    print("=== Face Mask Detection Model Conversion ===")
+
+    converter = create_converter()
+    if converter is None:
+        print(f"Model not found at {SAVED_MODEL_PATH}. Please train the model first.")
+        return
+
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    converter.representative_dataset = representative_dataset
+
+    print("Quantizing model to INT8...")
+    tflite_model = converter.convert()
+
+    with open(TFLITE_MODEL_PATH, 'wb') as f:
+        f.write(tflite_model)
+
+    print(f"TFLite model size: {len(tflite_model) / 1024 / 1024:.2f} MB")
+    print(f"TFLite model saved to {TFLITE_MODEL_PATH}")
+
+if __name__ == "__main__":
+    convert_model()
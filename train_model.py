@@ -1,13 +1,17 @@
 import os
-import numpy as np
+import json
 import matplotlib.pyplot as plt
-from PIL import Image
-from sklearn.model_selection import train_test_split
 import tensorflow as tf
 from tensorflow import keras
+from tensorflow.keras import mixed_precision
 import zipfile
 import requests
 import os
+from build_tfrecords import build_tfrecords, shard_pattern, tfrecords_up_to_date
+
+# Run convolutions and matmuls in float16 on GPUs with tensor cores
+if tf.config.list_physical_devices('GPU'):
+    mixed_precision.set_global_policy('mixed_float16')
 
 def download_dataset():
     """Download the face mask dataset from Kaggle"""
@@ -30,66 +34,30 @@ def download_dataset():
     print("https://www.kaggle.com/datasets/omkargurav/face-mask-dataset")
     print("Extract it to the 'data/' directory")
 
-def load_and_preprocess_data():
-    """Load and preprocess the face mask dataset"""
-    print("Loading and preprocessing data...")
+def parse_example(serialized):
+    """Decode, resize and scale a single serialized image"""
+    features = tf.io.parse_single_example(serialized, {
+        'image/encoded': tf.io.FixedLenFeature([], tf.string),
+        'image/label': tf.io.FixedLenFeature([], tf.int64)
+    })
+    # Match OpenCV's accurate integer DCT and uint8 resize used for calibration and serving
+    image = tf.io.decode_jpeg(features['image/encoded'], channels=3, dct_method='INTEGER_ACCURATE')
+    image = tf.image.resize(image, [128, 128], method='area')
+    image = tf.cast(tf.round(image), tf.uint8)
+    image = tf.cast(image, tf.float32) / 255.0
+    return image, features['image/label']
+
+def create_dataset(split, shuffle=False):
+    """Build a streaming tf.data pipeline over the TFRecord shards of a split"""
+    files = tf.io.gfile.glob(shard_pattern(split))
+    dataset = tf.data.TFRecordDataset(files, num_parallel_reads=tf.data.experimental.AUTOTUNE)
     
-    # Check if data directory exists
-    if not os.path.exists('data'):
-        print("Data directory not found. Please download the dataset first.")
-        return None, None
-    
-    with_mask_path = 'data/with_mask/'
-    without_mask_path = 'data/without_mask/'
-    
-    if not os.path.exists(with_mask_path) or not os.path.exists(without_mask_path):
-        print("Dataset not found in expected location.")
-        return None, None
-    
-    with_mask_files = os.listdir(with_mask_path)
-    without_mask_files = os.listdir(without_mask_path)
-    
-    print(f'Number of with mask images: {len(with_mask_files)}')
-    print(f'Number of without mask images: {len(without_mask_files)}')
-    
-    # Create labels
-    with_mask_labels = [1] * len(with_mask_files)
-    without_mask_labels = [0] * len(without_mask_files)
-    
-    labels = with_mask_labels + without_mask_labels
-    
-    # Load and preprocess images
-    data = []
-    
-    print("Processing with mask images...")
-    for img_file in with_mask_files:
-        try:
-            image = Image.open(os.path.join(with_mask_path, img_file))
-            image = image.resize((128, 128))
-            image = image.convert('RGB')
-            image = np.array(image)
-            data.append(image)
-        except Exception as e:
-            print(f"Error processing {img_file}: {e}")
-    
-    print("Processing without mask images...")
-    for img_file in without_mask_files:
-        try:
-            image = Image.open(os.path.join(without_mask_path, img_file))
-            image = image.resize((128, 128))
-            image = image.convert('RGB')
-            image = np.array(image)
-            data.append(image)
-        except Exception as e:
-            print(f"Error processing {img_file}: {e}")
-    
-    X = np.array(data)
-    Y = np.array(labels)
-    
-    print(f"Final dataset shape: {X.shape}")
-    print(f"Labels shape: {Y.shape}")
-    
-    return X, Y
+    if shuffle:
+        dataset = dataset.shuffle(4096, reshuffle_each_iteration=True)
+    
+    dataset = dataset.map(parse_example, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+    dataset = dataset.batch(64)
+    return dataset.prefetch(tf.data.experimental.AUTOTUNE)
 
 def create_model():
     """Create the CNN model for face mask detection"""
@@ -102,53 +70,61 @@ def create_model():
         keras.layers.Conv2D(32, kernel_size=(3, 3), activation='relu'),
         keras.layers.MaxPooling2D(pool_size=(2, 2)),
         
-        keras.layers.Conv2D(64, kernel_size=(3, 3), activation='relu'),
+        keras.layers.SeparableConv2D(64, kernel_size=(3, 3), padding='same', activation='relu'),
+        keras.layers.BatchNormalization(),
         keras.layers.MaxPooling2D(pool_size=(2, 2)),
         
-        keras.layers.Flatten(),
-        keras.layers.Dense(128, activation='relu'),
-        keras.layers.Dropout(0.5),
+        keras.layers.GlobalAveragePooling2D(),
         keras.layers.Dense(64, activation='relu'),
-        keras.layers.Dropout(0.5),
-        keras.layers.Dense(num_of_classes, activation='softmax')
+        keras.layers.Dropout(0.3),
+        keras.layers.Dense(num_of_classes, activation='softmax', dtype='float32')
     ])
     
     model.compile(
         optimizer='adam',
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        jit_compile=True
     )
     
     return model
 
-def train_model(model, X, Y):
+def train_model(model):
     """Train the model"""
     print("Training model...")
     
-    # Split data
-    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, random_state=2)
-    
-    # Scale data
-    X_train_scaled = X_train / 255.0
-    X_test_scaled = X_test / 255.0
-    
-    print(f"Training set shape: {X_train.shape}")
-    print(f"Test set shape: {X_test.shape}")
+    train_dataset = create_dataset('train', shuffle=True)
+    val_dataset = create_dataset('val')
+    test_dataset = create_dataset('test')
     
     # Train model
     history = model.fit(
-        X_train_scaled, Y_train,
-        validation_split=0.1,
+        train_dataset,
+        validation_data=val_dataset,
         epochs=10,
-        batch_size=32,
         verbose=1
     )
     
     # Evaluate model
-    loss, accuracy = model.evaluate(X_test_scaled, Y_test, verbose=0)
+    loss, accuracy = model.evaluate(test_dataset, verbose=0)
     print(f'Test Accuracy: {accuracy:.4f}')
     
-    return history, X_test_scaled, Y_test
+    return history
+
+def float32_copy(model):
+    """Rebuild a mixed precision model under the float32 policy"""
+    policy = mixed_precision.global_policy()
+    if policy.name == 'float32':
+        return model
+    
+    mixed_precision.set_global_policy('float32')
+    try:
+        export_model = create_model()
+    finally:
+        mixed_precision.set_global_policy(policy)
+    
+    export_model.set_weights(model.get_weights())
+    return export_model
 
 def save_model(model, history):
     """Save the trained model and training history"""
@@ -158,11 +134,13 @@ def save_model(model, history):
     if not os.path.exists('models'):
         os.makedirs('models')
     
-    # Save model
-    model.save('models/face_mask_detection_model.h5')
+    # Save model in SavedModel format. The export must be float32 so that
+    # convert_to_tflite.py can quantize every op to int8.
+    float32_copy(model).export('models/face_mask_detection_model')
     
     # Save training history
-    np.save('models/training_history.npy', history.history)
+    with open('models/training_history.json', 'w') as f:
+        json.dump({key: [float(value) for value in values] for key, values in history.history.items()}, f)
     
     print("Model saved successfully!")
 
@@ -205,10 +183,8 @@ def main():
     # Download dataset
     download_dataset()
     
-    # Load and preprocess data
-    X, Y = load_and_preprocess_data()
-    
-    if X is None or Y is None:
+    # Serialize the dataset to TFRecord shards if missing, incomplete or stale
+    if not tfrecords_up_to_date() and not build_tfrecords():
         print("Failed to load data. Exiting.")
         return
     
@@ -216,7 +192,7 @@ def main():
     model = create_model()
     
     # Train model
-    history, X_test, Y_test = train_model(model, X, Y)
+    history = train_model(model)
     
     # Save model
     save_model(model, history)